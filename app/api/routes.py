@@ -1,4 +1,12 @@
-"""API routes and endpoints."""
+"""API routes and endpoints.
+
+Endpoints returning large results (analysis results, annotation listings)
+should return ``ORJSONResponse(content)`` directly. Returning a plain dict
+runs FastAPI's ``jsonable_encoder`` over the whole payload before it is
+serialized, which costs far more than the JSON encoding itself. Content
+passed to ``ORJSONResponse`` must already be orjson-serializable, so dump
+Pydantic models first with ``model_dump()``.
+"""
 from fastapi import APIRouter
 
 
@@ -14,3 +22,8 @@ router = APIRouter()
 # @router.get("/documents/{document_id}")
 # async def get_document(document_id: str):
 #     pass
+#
+# @router.get("/documents/{document_id}/annotations")
+# async def list_annotations(document_id: str):
+#     annotations = ...
+#     return ORJSONResponse({"annotations": annotations})
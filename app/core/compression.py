@@ -0,0 +1,252 @@
+"""Response compression middleware with content-encoding negotiation.
+
+Supports gzip out of the box, plus zstd and brotli when the optional
+``zstandard`` and ``brotli`` packages are installed. The encoding is
+chosen from the client's Accept-Encoding header using the server's
+preference order, and responses smaller than the minimum size are sent
+uncompressed.
+"""
+import logging
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+
+# Every encoding the middleware knows how to produce, installed or not
+SUPPORTED_ENCODINGS = ("zstd", "br", "gzip")
+
+
+class Compressor(ABC):
+    """Incremental compressor interface used by the middleware."""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so streamed output is not held back."""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """Return any remaining output and end the stream."""
+
+
+class GzipCompressor(Compressor):
+    """gzip encoding using the standard library."""
+
+    def __init__(self, level: int = 6):
+        # wbits=31 selects the gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor(Compressor):
+    """brotli encoding, requires the ``brotli`` package."""
+
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+    """zstd encoding, requires the ``zstandard`` package."""
+
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_compressors() -> Dict[str, Callable[[], Compressor]]:
+    """Return compressor factories for every encoding usable in this environment."""
+    compressors: Dict[str, Callable[[], Compressor]] = {"gzip": GzipCompressor}
+    if brotli is not None:
+        compressors["br"] = BrotliCompressor
+    if zstandard is not None:
+        compressors["zstd"] = ZstdCompressor
+    return compressors
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into a mapping of encoding to q-value."""
+    accepted: Dict[str, float] = {}
+    for part in header.split(","):
+        fields = [field.strip() for field in part.split(";")]
+        encoding = fields[0].lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding] = quality
+    return accepted
+
+
+def select_encoding(header: str, preferred: Sequence[str]) -> Optional[str]:
+    """Pick the first server-preferred encoding the client accepts."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for encoding in preferred:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with zstd, brotli or gzip.
+
+    Args:
+        app: ASGI application to wrap
+        minimum_size: Responses with fewer bytes than this are not compressed
+        encodings: Encodings to offer, in server preference order. Names are
+            case-insensitive; encodings whose library is not installed are
+            skipped with a warning
+
+    Raises:
+        ValueError: If an encoding name is not one of SUPPORTED_ENCODINGS
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Sequence[str] = ("zstd", "br", "gzip"),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        compressors = available_compressors()
+        self.compressors: Dict[str, Callable[[], Compressor]] = {}
+        for name in (encoding.strip().lower() for encoding in encodings):
+            if not name:
+                continue
+            if name not in SUPPORTED_ENCODINGS:
+                raise ValueError(
+                    f"Unsupported compression encoding {name!r}; "
+                    f"expected one of {', '.join(SUPPORTED_ENCODINGS)}"
+                )
+            if name not in compressors:
+                logger.warning("Compression encoding %r disabled: library not installed", name)
+                continue
+            # Instantiate once so a broken compressor fails at startup, not per request
+            compressors[name]()
+            self.compressors[name] = compressors[name]
+        self.preferred: List[str] = list(self.compressors)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            encoding = select_encoding(headers.get("Accept-Encoding", ""), self.preferred)
+            if encoding is not None:
+                responder = CompressionResponder(
+                    self.app, self.minimum_size, encoding, self.compressors[encoding]
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class CompressionResponder:
+    """Compresses a single response with the negotiated encoding."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        encoding: str,
+        compressor_factory: Callable[[], Compressor],
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.compressor_factory = compressor_factory
+        self.compressor: Optional[Compressor] = None
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the start message until the first body chunk tells us
+            # whether the response is worth compressing.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compressor = self.compressor_factory()
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.compressor.compress(body)
+            else:
+                message["body"] = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        compressed = self.compressor.compress(body)
+        if not more_body:
+            compressed += self.compressor.finish()
+        message["body"] = compressed
+        await self.send(message)
@@ -1,6 +1,9 @@
 """Configuration management using Pydantic settings."""
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
+from app.core.compression import SUPPORTED_ENCODINGS
+
 
 class Settings(BaseSettings):
     """Application configuration loaded from environment variables."""
@@ -13,6 +16,11 @@ class Settings(BaseSettings):
     # CORS settings
     CORS_ORIGINS: str = "*"
     
+    # Response compression settings
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
+    
     # External service credentials
     CLAUDE_API_KEY: str = ""
     RAINDROP_API_KEY: str = ""
@@ -21,6 +29,31 @@ class Settings(BaseSettings):
     VULTR_OBJECT_STORAGE_SECRET_KEY: str = ""
     VULTR_OBJECT_STORAGE_BUCKET: str = ""
     
+    # Claude model connector settings
+    CLAUDE_API_URL: str = "https://api.anthropic.com"
+    CLAUDE_API_VERSION: str = "2023-06-01"
+    CLAUDE_TIMEOUT_SECONDS: float = 60.0
+    CLAUDE_MAX_RETRIES: int = 3
+    CLAUDE_MAX_RETRY_AFTER_SECONDS: float = 60.0
+    CLAUDE_INITIAL_CONCURRENCY: int = 8
+    CLAUDE_MIN_CONCURRENCY: int = 1
+    CLAUDE_MAX_CONCURRENCY: int = 64
+    CLAUDE_LATENCY_TARGET_SECONDS: float = 30.0
+    CLAUDE_HEDGE_ENABLED: bool = False
+    
+    @field_validator("COMPRESSION_ENCODINGS")
+    @classmethod
+    def validate_compression_encodings(cls, value: str) -> str:
+        """Normalize encoding names and reject unsupported ones at startup."""
+        names = [name.strip().lower() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in SUPPORTED_ENCODINGS]
+        if unknown:
+            raise ValueError(
+                f"Unsupported compression encodings {', '.join(unknown)}; "
+                f"expected any of {', '.join(SUPPORTED_ENCODINGS)}"
+            )
+        return ",".join(names)
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -10,17 +10,32 @@ Usage:
 Environment Variables:
     See .env.example for required configuration
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.api.routes import router
+from app.services.claude_client import close_claude_client
 
 
-# Initialize FastAPI application
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release shared upstream connection pools on shutdown."""
+    yield
+    await close_claude_client()
+
+
+# Initialize FastAPI application. ORJSONResponse only replaces the final
+# json.dumps step for routes returning plain objects; large-result routes
+# should return ORJSONResponse directly to skip jsonable_encoder as well.
 app = FastAPI(
     title=settings.APP_NAME,
     description="Medical Document AI Assistant Backend Service",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Parse CORS origins
@@ -41,6 +56,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add response compression middleware
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        encodings=settings.COMPRESSION_ENCODINGS.split(","),
+    )
+
 # Include API router with prefix
 app.include_router(router, prefix=settings.API_PREFIX)
 
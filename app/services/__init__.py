@@ -6,4 +6,8 @@ This module will contain service classes for:
 - Storage management with Vultr Object Storage (S3-compatible)
 - Bookmark management with Raindrop API
 - LiquidMetal AI orchestration and prompt management
+
+Available services:
+- claude_client: Claude model connector with adaptive concurrency,
+  jittered retries and hedged requests
 """
@@ -0,0 +1,423 @@
+"""Claude model connector with adaptive concurrency and hedged retries.
+
+All calls to the Claude Messages API go through a single pooled HTTP/2
+client. The number of requests in flight is controlled by an AIMD
+(additive increase, multiplicative decrease) limiter that grows slowly
+while the upstream is healthy and backs off sharply on 429s or when
+latency exceeds the configured target. Failed calls are retried with
+jittered exponential backoff, and a duplicate ("hedged") request can be
+sent when a call runs longer than the observed p95 latency.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Set
+
+import httpx
+
+from app.core.config import settings
+
+
+# Status codes worth retrying: rate limits, upstream overload and gateway errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+# Status codes signalling that the upstream wants less traffic from us
+CONGESTION_STATUS_CODES = {429, 503, 529}
+
+
+class ClaudeAPIError(Exception):
+    """Raised when the Claude API returns an error that cannot be retried away."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP-date.
+
+    Returns:
+        float: Seconds to wait (never negative), or None if the header is
+            missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AIMDLimiter:
+    """Concurrency limiter whose limit adapts using AIMD.
+
+    Each successful call raises the limit by ``increase / limit`` so the
+    limit grows by roughly ``increase`` per full window of requests. Growth
+    only happens while at least half the slots are in use, so idle or
+    sequential traffic cannot inflate the limit ahead of the next burst. A
+    congestion signal multiplies the limit by ``decrease_factor``. Signals
+    from requests that started before the last decrease are ignored: they
+    were sent at the old, higher limit, so one overload episode only
+    lowers the limit once per round trip however long the calls take.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("min_limit must be >= 1 and <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._waiters: deque = deque()
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently holding a slot."""
+        return self._in_flight
+
+    async def acquire(self) -> None:
+        """Wait until a slot is free and take it."""
+        while self._in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # We were woken but will not take the slot; pass it on
+                    self._wake_waiters()
+                raise
+        self._in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        if self._in_flight < self.limit:
+            self._in_flight += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Return a slot and wake up waiters."""
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def on_success(self) -> None:
+        """Additively increase the limit after a healthy response.
+
+        Must be called while the caller still holds its slot.
+        """
+        if self._in_flight < self._limit / 2:
+            return
+        self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+        self._wake_waiters()
+
+    def on_congestion(self, started_at: float) -> None:
+        """Multiplicatively decrease the limit after overload, a timeout or a slow response.
+
+        Args:
+            started_at: ``time.monotonic()`` when the congested request was sent
+        """
+        if started_at < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+
+    def _wake_waiters(self) -> None:
+        free = self.limit - self._in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class LatencyTracker:
+    """Rolling window of request latencies used to estimate percentiles."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        """Add a latency sample in seconds."""
+        self._samples.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the given percentile, or None until enough samples are collected."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ClaudeClient:
+    """Async client for the Claude Messages API.
+
+    Usage:
+        client = ClaudeClient.from_settings()
+        message = await client.create_message({
+            "model": "claude-3-5-sonnet-latest",
+            "max_tokens": 1024,
+            "messages": [{"role": "user", "content": "Summarize this note"}],
+        })
+        await client.aclose()
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.anthropic.com",
+        api_version: str = "2023-06-01",
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        max_retry_after: float = 60.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        latency_target: float = 30.0,
+        hedge: bool = False,
+        limiter: Optional[AIMDLimiter] = None,
+        latency_tracker: Optional[LatencyTracker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency_target = latency_target
+        self.hedge = hedge
+        self.limiter = limiter or AIMDLimiter()
+        self.latency = latency_tracker or LatencyTracker()
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={
+                "x-api-key": api_key,
+                "anthropic-version": api_version,
+                "content-type": "application/json",
+            },
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.limiter.max_limit * 2,
+                max_keepalive_connections=self.limiter.max_limit,
+            ),
+            # HTTP/2 only applies to real network connections; custom
+            # transports (e.g. the fake upstream in tests) ignore it.
+            http2=transport is None,
+            transport=transport,
+        )
+
+    @classmethod
+    def from_settings(cls, **kwargs: Any) -> "ClaudeClient":
+        """Build a client from the global application settings."""
+        limiter = AIMDLimiter(
+            initial_limit=settings.CLAUDE_INITIAL_CONCURRENCY,
+            min_limit=settings.CLAUDE_MIN_CONCURRENCY,
+            max_limit=settings.CLAUDE_MAX_CONCURRENCY,
+        )
+        options: Dict[str, Any] = {
+            "api_key": settings.CLAUDE_API_KEY,
+            "base_url": settings.CLAUDE_API_URL,
+            "api_version": settings.CLAUDE_API_VERSION,
+            "timeout": settings.CLAUDE_TIMEOUT_SECONDS,
+            "max_retries": settings.CLAUDE_MAX_RETRIES,
+            "max_retry_after": settings.CLAUDE_MAX_RETRY_AFTER_SECONDS,
+            "latency_target": settings.CLAUDE_LATENCY_TARGET_SECONDS,
+            "hedge": settings.CLAUDE_HEDGE_ENABLED,
+            "limiter": limiter,
+        }
+        options.update(kwargs)
+        return cls(**options)
+
+    async def __aenter__(self) -> "ClaudeClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self._http.aclose()
+
+    async def create_message(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a request to the Messages API and return the decoded response.
+
+        Args:
+            payload: Request body for ``POST /v1/messages``
+
+        Returns:
+            dict: Decoded JSON response from Claude
+
+        Raises:
+            ClaudeAPIError: If the request fails after all retries, returns
+                a non-retryable error, or asks to be retried after longer
+                than ``max_retry_after`` seconds
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(payload)
+            except httpx.TransportError as exc:
+                if attempt >= self.max_retries:
+                    raise ClaudeAPIError(f"Claude API request failed: {exc}") from exc
+                await asyncio.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code < 400:
+                return response.json()
+
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                raise ClaudeAPIError(
+                    f"Claude API returned {response.status_code}: {response.text}",
+                    status_code=response.status_code,
+                )
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            if retry_after is not None and retry_after > self.max_retry_after:
+                # Fail fast rather than hold the caller for the whole wait
+                raise ClaudeAPIError(
+                    f"Claude API returned {response.status_code} with Retry-After "
+                    f"{retry_after:.0f}s, above the {self.max_retry_after:.0f}s limit",
+                    status_code=response.status_code,
+                )
+            await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+            attempt += 1
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After.
+
+        Retry-After is a lower bound and is not capped by ``backoff_max``;
+        retrying before the server allows it would only earn another 429.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _send(self, payload: Dict[str, Any]) -> httpx.Response:
+        """Send one attempt, hedging it when enabled and the p95 is known."""
+        p95 = self.latency.percentile(95) if self.hedge else None
+        await self.limiter.acquire()
+        if p95 is None:
+            try:
+                return await self._send_once(payload)
+            finally:
+                self.limiter.release()
+
+        start = time.monotonic()
+        primary = self._start_task(payload)
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=p95)
+            if not done:
+                # Only hedge when there is spare capacity so hedges never add to
+                # an upstream that is already saturated or rate limiting us.
+                if not self.limiter.try_acquire():
+                    done, pending = await asyncio.wait(pending)
+                else:
+                    pending.add(self._start_task(payload))
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if self._first_success(done) is not None:
+                            break
+            response = self._first_success(done)
+            if response is None:
+                # Neither copy succeeded; surface the primary outcome
+                response = primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if response.status_code < 400:
+            # Measure from the primary's start so hedged wins do not hide
+            # the slow tail and drag the p95 down over time.
+            self.latency.record(time.monotonic() - start)
+        return response
+
+    @staticmethod
+    def _first_success(done: Set["asyncio.Task[httpx.Response]"]) -> Optional[httpx.Response]:
+        """Return the first successful response among finished tasks."""
+        # Retrieve every exception so failed copies are not logged as unhandled
+        failed = {task for task in done if task.exception() is not None}
+        for task in done - failed:
+            if task.result().status_code < 400:
+                return task.result()
+        return None
+
+    def _start_task(self, payload: Dict[str, Any]) -> "asyncio.Task[httpx.Response]":
+        """Run ``_send_once`` on a slot already taken, releasing it when the task ends."""
+        task = asyncio.create_task(self._send_once(payload, record_latency=False))
+        # A done callback also fires for tasks cancelled before they start
+        task.add_done_callback(self._release_task)
+        return task
+
+    def _release_task(self, task: "asyncio.Task[httpx.Response]") -> None:
+        """Return a hedged task's slot and mark any exception as retrieved."""
+        self.limiter.release()
+        if not task.cancelled():
+            task.exception()
+
+    async def _send_once(self, payload: Dict[str, Any], record_latency: bool = True) -> httpx.Response:
+        """Perform a single HTTP call and feed the outcome to the limiter."""
+        start = time.monotonic()
+        try:
+            response = await self._http.post("/v1/messages", json=payload)
+        except httpx.TimeoutException:
+            self.limiter.on_congestion(start)
+            raise
+        elapsed = time.monotonic() - start
+
+        if response.status_code in CONGESTION_STATUS_CODES or elapsed > self.latency_target:
+            self.limiter.on_congestion(start)
+        elif response.status_code < 400:
+            self.limiter.on_success()
+        if record_latency and response.status_code < 400:
+            self.latency.record(elapsed)
+        return response
+
+
+_client: Optional[ClaudeClient] = None
+
+
+def get_claude_client() -> ClaudeClient:
+    """Return the shared, lazily created Claude client."""
+    global _client
+    if _client is None:
+        _client = ClaudeClient.from_settings()
+    return _client
+
+
+async def close_claude_client() -> None:
+    """Close the shared Claude client if it was created."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
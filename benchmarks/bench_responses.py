@@ -0,0 +1,170 @@
+"""Benchmark JSON serialization and response compression on large payloads.
+
+Builds synthetic analysis results and annotation listings shaped like the
+API's large responses and compares:
+- stdlib json (as used by Starlette's JSONResponse) against orjson
+- the full request path through a FastAPI route: returning a dict (which
+  runs jsonable_encoder before the response class renders it) against
+  returning ORJSONResponse directly
+- gzip, brotli and zstd wire size and compression time at the levels used
+  by app.core.compression
+
+Usage:
+    python -m benchmarks.bench_responses
+    python -m benchmarks.bench_responses --annotations 50000 --repeat 10
+"""
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+import orjson
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import available_compressors
+
+
+LABELS = ["medication", "diagnosis", "procedure", "lab_result", "allergy", "vital_sign"]
+TERMS = [
+    "metformin 500 mg twice daily",
+    "type 2 diabetes mellitus",
+    "hemoglobin A1c 7.2%",
+    "penicillin allergy (rash)",
+    "blood pressure 138/86 mmHg",
+    "colonoscopy with polypectomy",
+    "atorvastatin 20 mg nightly",
+    "chronic kidney disease stage 3a",
+]
+
+
+def build_annotations(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Build an annotation listing similar to GET /documents/{id}/annotations."""
+    rng = random.Random(seed)
+    annotations = []
+    for index in range(count):
+        start = rng.randint(0, 200_000)
+        text = rng.choice(TERMS)
+        annotations.append({
+            "id": f"ann_{index:08d}",
+            "document_id": f"doc_{rng.randint(1, 50):04d}",
+            "label": rng.choice(LABELS),
+            "text": text,
+            "span": {"start": start, "end": start + len(text)},
+            "confidence": round(rng.random(), 4),
+            "normalized": {"system": "SNOMED-CT", "code": str(rng.randint(10**7, 10**8))},
+            "reviewed": rng.random() < 0.3,
+            "created_at": f"2024-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z",
+        })
+    return annotations
+
+
+def build_analysis_result(annotations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build an analysis result embedding sections, a summary and annotations."""
+    return {
+        "document_id": "doc_0001",
+        "status": "completed",
+        "summary": " ".join(TERMS) * 20,
+        "sections": [
+            {"title": f"Section {index}", "text": " ".join(TERMS) * 5}
+            for index in range(50)
+        ],
+        "entities": annotations,
+    }
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    """Serialize the way Starlette's JSONResponse does."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def build_route_client(payload: Any) -> TestClient:
+    """Build an app serving ``payload`` through each response strategy."""
+    app = FastAPI()
+
+    @app.get("/dict-json", response_class=JSONResponse)
+    async def dict_json():
+        return payload
+
+    @app.get("/dict-orjson", response_class=ORJSONResponse)
+    async def dict_orjson():
+        return payload
+
+    @app.get("/direct-orjson")
+    async def direct_orjson():
+        return ORJSONResponse(payload)
+
+    return TestClient(app, headers={"Accept-Encoding": "identity"})
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> float:
+    """Return the best wall-clock time in milliseconds over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def compress_with(factory: Callable, body: bytes) -> bytes:
+    """Compress a whole body the way the middleware does for non-streamed responses."""
+    compressor = factory()
+    return compressor.compress(body) + compressor.finish()
+
+
+def run(annotation_count: int, repeat: int) -> None:
+    """Print serialization and compression results for each payload."""
+    annotations = build_annotations(annotation_count)
+    payloads = {
+        "annotations": {"annotations": annotations},
+        "analysis": build_analysis_result(annotations),
+    }
+    compressors = available_compressors()
+
+    for name, payload in payloads.items():
+        body = orjson.dumps(payload)
+        print(f"\n== {name}: {len(body) / 1024 / 1024:.2f} MB of JSON ==")
+
+        print(f"{'serializer':<18}{'best ms':>10}")
+        json_ms = time_call(lambda: stdlib_dumps(payload), repeat)
+        orjson_ms = time_call(lambda: orjson.dumps(payload), repeat)
+        encoder_ms = time_call(lambda: jsonable_encoder(payload), repeat)
+        print(f"{'json':<18}{json_ms:>10.2f}")
+        print(f"{'orjson':<18}{orjson_ms:>10.2f}  ({json_ms / orjson_ms:.1f}x faster)")
+        print(f"{'jsonable_encoder':<18}{encoder_ms:>10.2f}  (runs before either for dict returns)")
+
+        client = build_route_client(payload)
+        print(f"{'route':<30}{'best ms':>10}")
+        for path, label in [
+            ("/dict-json", "dict -> JSONResponse"),
+            ("/dict-orjson", "dict -> ORJSONResponse"),
+            ("/direct-orjson", "ORJSONResponse(content)"),
+        ]:
+            route_ms = time_call(lambda: client.get(path), repeat)
+            print(f"{label:<30}{route_ms:>10.2f}")
+
+        print(f"{'encoding':<12}{'best ms':>10}{'size KB':>12}{'ratio':>8}")
+        print(f"{'identity':<12}{0.0:>10.2f}{len(body) / 1024:>12.1f}{1.0:>8.1f}")
+        for encoding, factory in compressors.items():
+            compressed = compress_with(factory, body)
+            elapsed = time_call(lambda: compress_with(factory, body), repeat)
+            ratio = len(body) / len(compressed)
+            print(f"{encoding:<12}{elapsed:>10.2f}{len(compressed) / 1024:>12.1f}{ratio:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--annotations", type=int, default=20_000, help="annotations per payload")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per measurement")
+    args = parser.parse_args()
+    run(args.annotations, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Local fake of the Claude Messages API for exercising the model connector.
+
+The fake injects latency and rate limiting so retry, AIMD and hedging
+behaviour can be tested without network access or API quota.
+
+Usage:
+    In tests, route a client to the fake through an ASGI transport:
+        upstream = FakeClaudeUpstream(latency=0.05, max_concurrency=4)
+        transport = httpx.ASGITransport(app=upstream.app)
+        client = ClaudeClient(api_key="test", base_url="http://fake", transport=transport)
+
+    As a standalone server:
+        uvicorn tests.fake_claude_upstream:app --port 9000
+"""
+import asyncio
+from typing import Callable, Optional, Union
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class FakeClaudeUpstream:
+    """Configurable stand-in for ``POST /v1/messages``.
+
+    Args:
+        latency: Seconds to wait before answering each request (errors
+            included), or a callable receiving the 1-based request number
+            and returning the delay
+        max_concurrency: Return 429 when more requests than this are in flight
+        fail_first: Fail this many requests with ``fail_status`` before serving normally
+        fail_status: Status code returned for the first ``fail_first`` requests
+        retry_after: Value of the Retry-After header sent with 429 responses,
+            in seconds or as an HTTP-date string
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Callable[[int], float]] = 0.0,
+        max_concurrency: Optional[int] = None,
+        fail_first: int = 0,
+        fail_status: int = 429,
+        retry_after: Optional[Union[float, str]] = None,
+    ):
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.app = FastAPI()
+        self.app.post("/v1/messages")(self.create_message)
+
+    async def create_message(self, request: Request) -> JSONResponse:
+        """Serve a canned message or an injected error after the configured delay."""
+        self.request_count += 1
+        number = self.request_count
+        body = await request.json()
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            over_limit = self.max_concurrency is not None and self.in_flight > self.max_concurrency
+            delay = self.latency(number) if callable(self.latency) else self.latency
+            await asyncio.sleep(delay)
+
+            if number <= self.fail_first and self.fail_status != 429:
+                return JSONResponse(
+                    status_code=self.fail_status,
+                    content={"type": "error", "error": {"type": "overloaded_error"}},
+                )
+            if number <= self.fail_first or over_limit:
+                self.rate_limited_count += 1
+                headers = {}
+                if self.retry_after is not None:
+                    headers["retry-after"] = str(self.retry_after)
+                return JSONResponse(
+                    status_code=429,
+                    content={"type": "error", "error": {"type": "rate_limit_error"}},
+                    headers=headers,
+                )
+
+            return JSONResponse(
+                content={
+                    "id": f"msg_fake_{number}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body.get("model", "fake"),
+                    "content": [{"type": "text", "text": "ok"}],
+                    "stop_reason": "end_turn",
+                }
+            )
+        finally:
+            self.in_flight -= 1
+
+
+# Default instance for running the fake as a standalone server
+app = FakeClaudeUpstream(latency=0.2, max_concurrency=8).app
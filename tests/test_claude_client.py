@@ -0,0 +1,331 @@
+"""Unit tests for the Claude model connector."""
+import asyncio
+import gc
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from app.services.claude_client import (
+    AIMDLimiter,
+    ClaudeAPIError,
+    ClaudeClient,
+    LatencyTracker,
+    parse_retry_after,
+)
+from tests.fake_claude_upstream import FakeClaudeUpstream
+
+
+PAYLOAD = {
+    "model": "claude-test",
+    "max_tokens": 16,
+    "messages": [{"role": "user", "content": "hello"}],
+}
+
+
+def make_client(upstream: FakeClaudeUpstream, **kwargs) -> ClaudeClient:
+    """Create a client wired to the fake upstream with fast backoff."""
+    options = {"backoff_base": 0.01, "backoff_max": 0.05}
+    options.update(kwargs)
+    return ClaudeClient(
+        api_key="test",
+        base_url="http://fake-claude",
+        transport=httpx.ASGITransport(app=upstream.app),
+        **options,
+    )
+
+
+async def test_create_message_returns_response_body():
+    """Test that a successful call returns the decoded message."""
+    upstream = FakeClaudeUpstream()
+    async with make_client(upstream) as client:
+        message = await client.create_message(PAYLOAD)
+
+    assert message["type"] == "message"
+    assert message["model"] == "claude-test"
+
+
+async def test_retries_after_rate_limit():
+    """Test that 429 responses are retried until the call succeeds."""
+    upstream = FakeClaudeUpstream(fail_first=2)
+    async with make_client(upstream, max_retries=3) as client:
+        message = await client.create_message(PAYLOAD)
+
+    assert message["id"] == "msg_fake_3"
+    assert upstream.rate_limited_count == 2
+
+
+async def test_retry_after_is_not_capped_by_backoff_max():
+    """Test that the client waits at least Retry-After before retrying."""
+    upstream = FakeClaudeUpstream(fail_first=1, retry_after=0.3)
+    async with make_client(upstream, backoff_max=0.05) as client:
+        start = time.monotonic()
+        await client.create_message(PAYLOAD)
+        elapsed = time.monotonic() - start
+
+    assert upstream.request_count == 2
+    assert elapsed >= 0.3
+
+
+async def test_long_retry_after_fails_fast():
+    """Test that a Retry-After above max_retry_after raises instead of sleeping."""
+    upstream = FakeClaudeUpstream(fail_first=1, retry_after=3600)
+    async with make_client(upstream, max_retry_after=1.0) as client:
+        start = time.monotonic()
+        with pytest.raises(ClaudeAPIError) as exc_info:
+            await client.create_message(PAYLOAD)
+        elapsed = time.monotonic() - start
+
+    assert exc_info.value.status_code == 429
+    assert upstream.request_count == 1
+    assert elapsed < 1.0
+
+
+async def test_http_date_retry_after_is_honoured():
+    """Test that Retry-After given as an HTTP-date is parsed and capped."""
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(hours=1), usegmt=True)
+    upstream = FakeClaudeUpstream(fail_first=1, retry_after=retry_at)
+    async with make_client(upstream, max_retry_after=60.0) as client:
+        with pytest.raises(ClaudeAPIError):
+            await client.create_message(PAYLOAD)
+
+    assert upstream.request_count == 1
+
+
+def test_parse_retry_after_formats():
+    """Test parsing of delta-seconds, HTTP-date and malformed Retry-After values."""
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(minutes=5), usegmt=True)
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=120), usegmt=True)
+
+    assert parse_retry_after("30") == 30.0
+    assert parse_retry_after(past) == 0.0
+    assert 100 < parse_retry_after(future) <= 120
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+async def test_raises_when_retries_exhausted():
+    """Test that ClaudeAPIError is raised once retries run out."""
+    upstream = FakeClaudeUpstream(fail_first=10)
+    async with make_client(upstream, max_retries=2) as client:
+        with pytest.raises(ClaudeAPIError) as exc_info:
+            await client.create_message(PAYLOAD)
+
+    assert exc_info.value.status_code == 429
+    assert upstream.request_count == 3
+
+
+async def test_rate_limit_shrinks_concurrency_limit():
+    """Test that a 429 multiplicatively decreases the limit."""
+    upstream = FakeClaudeUpstream(fail_first=1)
+    limiter = AIMDLimiter(initial_limit=8, max_limit=16)
+    async with make_client(upstream, limiter=limiter) as client:
+        await client.create_message(PAYLOAD)
+
+    assert limiter.limit == 4
+
+
+@pytest.mark.parametrize("status_code", [503, 529])
+async def test_overload_shrinks_concurrency_limit(status_code):
+    """Test that 503 and 529 overload responses decrease the limit."""
+    upstream = FakeClaudeUpstream(fail_first=1, fail_status=status_code)
+    limiter = AIMDLimiter(initial_limit=8, max_limit=16)
+    async with make_client(upstream, limiter=limiter) as client:
+        await client.create_message(PAYLOAD)
+
+    assert limiter.limit == 4
+
+
+class TimeoutTransport(httpx.AsyncBaseTransport):
+    """Transport whose requests always time out."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+
+async def test_timeout_shrinks_concurrency_limit():
+    """Test that request timeouts decrease the limit before being retried."""
+    limiter = AIMDLimiter(initial_limit=8, max_limit=16)
+    client = ClaudeClient(
+        api_key="test",
+        base_url="http://fake-claude",
+        transport=TimeoutTransport(),
+        limiter=limiter,
+        max_retries=0,
+        backoff_base=0.01,
+    )
+    async with client:
+        with pytest.raises(ClaudeAPIError):
+            await client.create_message(PAYLOAD)
+
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+async def test_spread_out_rate_limits_decrease_limit_once():
+    """Test that 429s from one overload episode halve the limit only once.
+
+    The 429s arrive over 1.5 seconds, but every request was sent before the
+    first decrease, so they all describe the same episode.
+    """
+    upstream = FakeClaudeUpstream(fail_first=6, latency=lambda n: 0.25 * n)
+    limiter = AIMDLimiter(initial_limit=16, max_limit=16)
+    async with make_client(upstream, limiter=limiter, max_retries=0) as client:
+        results = await asyncio.gather(
+            *(client.create_message(PAYLOAD) for _ in range(6)), return_exceptions=True
+        )
+
+    assert all(isinstance(result, ClaudeAPIError) for result in results)
+    assert limiter.limit == 8
+
+
+def test_congestion_after_decrease_lowers_limit_again():
+    """Test that requests sent after a decrease can lower the limit further."""
+    limiter = AIMDLimiter(initial_limit=16, max_limit=16)
+
+    limiter.on_congestion(time.monotonic())
+    limiter.on_congestion(time.monotonic())
+
+    assert limiter.limit == 4
+
+
+async def test_success_grows_concurrency_limit():
+    """Test that healthy responses additively increase a busy limit."""
+    upstream = FakeClaudeUpstream(latency=0.01)
+    limiter = AIMDLimiter(initial_limit=2, max_limit=16)
+    async with make_client(upstream, limiter=limiter) as client:
+        await asyncio.gather(*(client.create_message(PAYLOAD) for _ in range(20)))
+
+    assert limiter.limit > 2
+
+
+async def test_sequential_traffic_does_not_grow_limit():
+    """Test that calls using a fraction of the slots leave the limit unchanged."""
+    upstream = FakeClaudeUpstream()
+    limiter = AIMDLimiter(initial_limit=8, max_limit=64)
+    async with make_client(upstream, limiter=limiter) as client:
+        for _ in range(200):
+            await client.create_message(PAYLOAD)
+
+    assert limiter.limit == 8
+
+
+async def test_slow_responses_count_as_congestion():
+    """Test that responses over the latency target decrease the limit."""
+    upstream = FakeClaudeUpstream(latency=0.05)
+    limiter = AIMDLimiter(initial_limit=8)
+    async with make_client(upstream, limiter=limiter, latency_target=0.01) as client:
+        await client.create_message(PAYLOAD)
+
+    assert limiter.limit == 4
+
+
+async def test_limiter_caps_requests_in_flight():
+    """Test that concurrent calls never exceed the concurrency limit."""
+    upstream = FakeClaudeUpstream(latency=0.02)
+    limiter = AIMDLimiter(initial_limit=3, max_limit=3)
+    async with make_client(upstream, limiter=limiter) as client:
+        await asyncio.gather(*(client.create_message(PAYLOAD) for _ in range(12)))
+
+    assert upstream.peak_in_flight == 3
+    assert limiter.in_flight == 0
+
+
+async def test_adapts_to_upstream_concurrency_quota():
+    """Test that AIMD converges under an upstream enforcing a concurrency quota."""
+    upstream = FakeClaudeUpstream(latency=0.01, max_concurrency=4)
+    limiter = AIMDLimiter(initial_limit=16, max_limit=16)
+    async with make_client(upstream, limiter=limiter, max_retries=10) as client:
+        results = await asyncio.gather(*(client.create_message(PAYLOAD) for _ in range(40)))
+
+    assert len(results) == 40
+    assert upstream.rate_limited_count > 0
+    assert limiter.limit < 16
+
+
+async def test_hedged_request_beats_slow_primary():
+    """Test that a call slower than the p95 is hedged and the fast copy wins."""
+    warmup = 20
+    slow_request = warmup + 1
+    upstream = FakeClaudeUpstream(latency=lambda n: 1.0 if n == slow_request else 0.03)
+    tracker = LatencyTracker(min_samples=warmup)
+    async with make_client(upstream, hedge=True, latency_tracker=tracker) as client:
+        for _ in range(warmup):
+            await client.create_message(PAYLOAD)
+
+        start = time.monotonic()
+        message = await client.create_message(PAYLOAD)
+        elapsed = time.monotonic() - start
+        # Let the cancelled slow copy unwind and hand back its slot
+        await asyncio.sleep(0.05)
+
+    assert message["id"] == f"msg_fake_{slow_request + 1}"
+    assert elapsed < 0.5
+    assert client.limiter.in_flight == 0
+    # The sample covers the wait before hedging plus the hedge itself
+    assert tracker.percentile(100) >= 0.055
+
+
+class RacingTransport(httpx.AsyncBaseTransport):
+    """Serves warmup calls, then fails each primary as its hedge succeeds."""
+
+    def __init__(self, warmup: int):
+        self.warmup = warmup
+        self.request_count = 0
+        self.hedge_arrived = asyncio.Event()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.request_count += 1
+        number = self.request_count
+        if number <= self.warmup:
+            await asyncio.sleep(0.01)
+        elif (number - self.warmup) % 2 == 1:
+            self.hedge_arrived = asyncio.Event()
+            await self.hedge_arrived.wait()
+            raise httpx.ConnectError("connection reset", request=request)
+        else:
+            self.hedge_arrived.set()
+        return httpx.Response(200, json={"id": f"msg_{number}"}, request=request)
+
+
+async def test_failed_primary_exception_is_retrieved():
+    """Test that primaries failing alongside a winning hedge are not reported as unhandled."""
+    errors = []
+    asyncio.get_running_loop().set_exception_handler(
+        lambda loop, context: errors.append(context["message"])
+    )
+    warmup = 20
+    client = ClaudeClient(
+        api_key="test",
+        base_url="http://fake-claude",
+        transport=RacingTransport(warmup),
+        hedge=True,
+        latency_tracker=LatencyTracker(min_samples=warmup),
+    )
+    async with client:
+        for _ in range(warmup):
+            await client.create_message(PAYLOAD)
+        # Several rounds, as the order of finished tasks varies between runs
+        messages = [await client.create_message(PAYLOAD) for _ in range(10)]
+        await asyncio.sleep(0.01)
+        gc.collect()
+
+    assert [message["id"] for message in messages] == [
+        f"msg_{warmup + 2 * round_number}" for round_number in range(1, 11)
+    ]
+    assert errors == []
+    assert client.limiter.in_flight == 0
+
+
+def test_latency_tracker_requires_min_samples():
+    """Test that percentiles are only reported once enough samples exist."""
+    tracker = LatencyTracker(min_samples=5)
+    for value in range(4):
+        tracker.record(float(value))
+    assert tracker.percentile(95) is None
+
+    for value in range(4, 100):
+        tracker.record(float(value))
+    assert tracker.percentile(95) == 94.0
@@ -0,0 +1,195 @@
+"""Unit tests for response compression and JSON serialization."""
+import gzip
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, Compressor, select_encoding
+from app.main import app as main_app
+
+
+LARGE_PAYLOAD = {
+    "annotations": [
+        {"id": i, "label": "medication", "text": "metformin 500 mg twice daily", "score": 0.97}
+        for i in range(200)
+    ]
+}
+
+
+def create_app_with_compression(minimum_size: int = 1024, encodings=("zstd", "br", "gzip")) -> FastAPI:
+    """Create a FastAPI app with the compression middleware."""
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size, encodings=encodings)
+
+    @app.get("/large")
+    async def large_endpoint():
+        return LARGE_PAYLOAD
+
+    @app.get("/small")
+    async def small_endpoint():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream_endpoint():
+        async def chunks():
+            for _ in range(3):
+                yield b"x" * 2000
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+def test_gzip_applied_to_large_response():
+    """Test that large responses are gzip-encoded when the client accepts gzip."""
+    client = TestClient(create_app_with_compression())
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.json() == LARGE_PAYLOAD
+
+
+def test_small_response_not_compressed():
+    """Test that responses below the minimum size are sent as-is."""
+    client = TestClient(create_app_with_compression())
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "ok"}
+
+
+def test_no_compression_without_accept_encoding():
+    """Test that responses are not compressed when the client accepts no encoding."""
+    client = TestClient(create_app_with_compression())
+
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_brotli_applied_when_accepted():
+    """Test that brotli is used when preferred and accepted."""
+    brotli = pytest.importorskip("brotli")
+    client = TestClient(create_app_with_compression(encodings=("br", "gzip")))
+
+    with client.stream("GET", "/large", headers={"Accept-Encoding": "br, gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(raw).startswith(b'{"annotations"')
+
+
+def test_zstd_applied_when_accepted():
+    """Test that zstd is used when preferred and accepted."""
+    zstandard = pytest.importorskip("zstandard")
+    client = TestClient(create_app_with_compression())
+
+    with client.stream("GET", "/large", headers={"Accept-Encoding": "zstd, br, gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "zstd"
+    decompressed = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    assert decompressed.startswith(b'{"annotations"')
+
+
+def test_streaming_response_compressed():
+    """Test that streamed responses are compressed incrementally."""
+    client = TestClient(create_app_with_compression())
+
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == b"x" * 6000
+
+
+def test_select_encoding_respects_quality_values():
+    """Test that encodings refused with q=0 are never selected."""
+    preferred = ["zstd", "br", "gzip"]
+    assert select_encoding("gzip, br;q=0", ["br", "gzip"]) == "gzip"
+    assert select_encoding("*", preferred) == "zstd"
+    assert select_encoding("*;q=0, gzip", preferred) == "gzip"
+    assert select_encoding("deflate", preferred) is None
+    assert select_encoding("", preferred) is None
+
+
+def test_encoding_names_are_case_insensitive():
+    """Test that configured encoding names are normalized to lowercase."""
+    client = TestClient(create_app_with_compression(encodings=(" GZIP ",)))
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_unknown_encoding_name_rejected():
+    """Test that an unsupported encoding name raises instead of being dropped."""
+    with pytest.raises(ValueError, match="deflate"):
+        CompressionMiddleware(FastAPI(), encodings=("deflate", "gzip"))
+
+
+def test_missing_encoding_library_logged(monkeypatch, caplog):
+    """Test that encodings without their library are skipped with a warning."""
+    monkeypatch.setattr(compression, "zstandard", None)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.compression"):
+        middleware = CompressionMiddleware(FastAPI(), encodings=("zstd", "gzip"))
+
+    assert middleware.preferred == ["gzip"]
+    assert "zstd" in caplog.text
+
+
+def test_compressor_requires_all_methods():
+    """Test that an incomplete Compressor cannot be instantiated."""
+    class HalfCompressor(Compressor):
+        def compress(self, data: bytes) -> bytes:
+            return data
+
+    with pytest.raises(TypeError):
+        HalfCompressor()
+
+
+@pytest.fixture
+def large_main_app_route():
+    """Temporarily serve LARGE_PAYLOAD from the main application."""
+    async def compression_test_endpoint():
+        return ORJSONResponse(LARGE_PAYLOAD)
+
+    main_app.add_api_route("/compression-test", compression_test_endpoint, methods=["GET"])
+    route = main_app.router.routes[-1]
+    yield route.path
+    main_app.router.routes.remove(route)
+
+
+def test_main_app_compresses_large_responses(large_main_app_route):
+    """Test that the main application gzip-encodes large responses."""
+    client = TestClient(main_app)
+
+    response = client.get(large_main_app_route, headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == LARGE_PAYLOAD
+
+
+def test_main_app_does_not_compress_health():
+    """Test that the small /health response is sent uncompressed."""
+    client = TestClient(main_app)
+
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"status": "ok"}
+
+
+def test_main_app_uses_orjson_responses():
+    """Test that the main application serializes responses with orjson."""
+    route = next(route for route in main_app.routes if route.path == "/health")
+    response_class = getattr(route.response_class, "value", route.response_class)
+    assert response_class is ORJSONResponse
@@ -17,6 +17,7 @@ APPLICATION_MODULES = [
     "app.core.config",
     "app.models",
     "app.services",
+    "app.services.claude_client",
     "app.main",
 ]
 